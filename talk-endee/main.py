@@ -4,12 +4,21 @@ Semantic Search + RAG System powered by Endee Vector Database
 """
 
 import argparse
+import json
 import sys
 from pathlib import Path
 from src.config import Config
 from src.ingest import IngestionPipeline
 from src.retriever import RAGRetriever
 from src.generator import AnswerGenerator
+from src.scheduler import GenerationScheduler
+
+def positive_int(value):
+    """argparse type for options that must be >= 1"""
+    number = int(value)
+    if number < 1:
+        raise argparse.ArgumentTypeError(f"must be a positive integer, got {value}")
+    return number
 
 def cmd_ingest(args):
     """Handle ingest command"""
@@ -73,6 +82,53 @@ def cmd_query(args):
         print(f"✗ Error during query: {e}", file=sys.stderr)
         sys.exit(1)
 
+def cmd_batch(args):
+    """Handle batch command"""
+    try:
+        with open(args.file, 'r') as f:
+            questions = [line.strip() for line in f if line.strip()]
+        
+        if not questions:
+            print("No questions found.")
+            return
+        
+        retriever = RAGRetriever()
+        items = []
+        for question in questions:
+            retrieved_docs = retriever.retrieve(question, top_k=args.top_k)
+            items.append((question, retriever.format_context(retrieved_docs)))
+        
+        print(f"\nGenerating {len(items)} answers...")
+        with GenerationScheduler(max_concurrency=args.concurrency) as scheduler:
+            results = scheduler.generate_many(items)
+            metrics = scheduler.metrics()
+        
+        for result in results:
+            print(f"\n{'='*60}")
+            print(f"Query: {result['query']}")
+            print(f"{'='*60}")
+            if result['status'] == 'success':
+                print(f"Answer:\n{result['answer']}")
+            else:
+                print(f"✗ Error: {result['error']}")
+        
+        if args.output:
+            with open(args.output, 'w') as f:
+                json.dump(results, f, indent=2)
+            print(f"\n✓ Results written to: {args.output}")
+        
+        print(f"\n{'='*60}")
+        print(f"Completed: {metrics['completed']}  Failed: {metrics['failed']}  Deduplicated: {metrics['deduplicated']}")
+        print(f"Retries: {metrics['retries']}  Rate limited: {metrics['rate_limited']}")
+        print(f"Throughput: {metrics['requests_per_s']:.2f} req/s, {metrics['tokens_per_s']:.0f} tokens/s")
+        print(f"Queue wait: avg {metrics['avg_queue_wait_s']:.2f}s, max {metrics['max_queue_wait_s']:.2f}s")
+        print(f"Tokens used: {metrics['total_tokens']}")
+        print(f"{'='*60}")
+    
+    except Exception as e:
+        print(f"✗ Error during batch: {e}", file=sys.stderr)
+        sys.exit(1)
+
 def cmd_info(args):
     """Handle info command"""
     try:
@@ -121,6 +177,9 @@ Examples:
   python main.py query "What is semantic search?"
   python main.py query "How does RAG work?" --top-k 3
 
+  # Answer a file of questions (one per line) concurrently
+  python main.py batch --file questions.txt --output answers.json
+
   # Show system info
   python main.py info
         """
@@ -143,6 +202,14 @@ Examples:
     query_parser.add_argument("--search-only", action="store_true", help="Only search, don't generate answer")
     query_parser.set_defaults(func=cmd_query)
     
+    # Batch command
+    batch_parser = subparsers.add_parser("batch", help="Answer many questions concurrently")
+    batch_parser.add_argument("--file", required=True, help="Path to a file with one question per line")
+    batch_parser.add_argument("--top-k", type=int, default=5, help="Number of results to retrieve per question (default: 5)")
+    batch_parser.add_argument("--concurrency", type=positive_int, default=None, help="Maximum concurrent LLM requests (default: from config)")
+    batch_parser.add_argument("--output", help="Write results as JSON to this file")
+    batch_parser.set_defaults(func=cmd_batch)
+    
     # Info command
     info_parser = subparsers.add_parser("info", help="Show system information")
     info_parser.set_defaults(func=cmd_info)
@@ -5,8 +5,9 @@ import os
 
 
 class AnswerGenerator:
-    def __init__(self, model: str = None):
+    def __init__(self, model: str = None, api_url: str = None):
         self.model = model or os.getenv("GROQ_DEFAULT_MODEL", "llama-3.1-8b-instant")
+        self.api_url = api_url or Config.GROQ_API_URL
 
     def _build_prompts(self, query: str, context: str) -> Dict[str, str]:
         system_prompt = (
@@ -21,12 +22,9 @@ class AnswerGenerator:
         user_prompt = f"Context:\n{context}\n\nQuestion: {query}\n\nPlease answer the question based on the context above."
         return {"system": system_prompt, "user": user_prompt}
 
-    def generate(self, query: str, context: str) -> Dict[str, Any]:
+    def build_payload(self, query: str, context: str) -> Dict[str, Any]:
         prompts = self._build_prompts(query, context)
-
-        headers = {"Authorization": f"Bearer {Config.GROQ_API_KEY}", "Content-Type": "application/json"}
-        url = f"{Config.GROQ_API_URL}/chat/completions"
-        payload = {
+        return {
             "model": self.model,
             "messages": [
                 {"role": "system", "content": prompts['system']},
@@ -36,11 +34,12 @@ class AnswerGenerator:
             "max_tokens": 500,
         }
 
-        print(f"Generating answer using Groq model {self.model}...")
-        r = requests.post(url, json=payload, headers=headers, timeout=30)
-        r.raise_for_status()
-        j = r.json()
+    def post(self, payload: Dict[str, Any], timeout: float = 30) -> requests.Response:
+        headers = {"Authorization": f"Bearer {Config.GROQ_API_KEY}", "Content-Type": "application/json"}
+        url = f"{self.api_url}/chat/completions"
+        return requests.post(url, json=payload, headers=headers, timeout=timeout)
 
+    def parse_response(self, query: str, j: Any) -> Dict[str, Any]:
         answer = None
         if isinstance(j, dict) and 'choices' in j:
             choices = j.get('choices', [])
@@ -55,3 +54,11 @@ class AnswerGenerator:
         usage = j.get("usage", {"prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0}) if isinstance(j, dict) else {"prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0}
 
         return {"query": query, "answer": answer, "model": self.model, "usage": usage}
+
+    def generate(self, query: str, context: str) -> Dict[str, Any]:
+        payload = self.build_payload(query, context)
+
+        print(f"Generating answer using Groq model {self.model}...")
+        r = self.post(payload)
+        r.raise_for_status()
+        return self.parse_response(query, r.json())
@@ -0,0 +1,424 @@
+"""
+Scheduler module - Run many generation requests concurrently within Groq rate limits
+"""
+
+from concurrent.futures import Future, ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import List, Dict, Any, Iterable, Optional, Tuple
+import json
+import random
+import re
+import threading
+import time
+import requests
+from src.config import Config
+from src.generator import AnswerGenerator
+
+RETRYABLE_STATUS = {429, 500, 502, 503, 504}
+
+# Groq reports x-ratelimit-reset-* as durations such as "2m59.56s", "7.66s" or "120ms"
+_DURATION_PART = re.compile(r"(\d+(?:\.\d+)?)(ms|h|m|s)")
+_DURATION_UNITS = {"ms": 0.001, "s": 1.0, "m": 60.0, "h": 3600.0}
+
+
+def parse_duration(value: Optional[str]) -> Optional[float]:
+    """Parse a Retry-After or x-ratelimit-reset-* header value into seconds."""
+    if not value:
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        pass
+    parts = _DURATION_PART.findall(value)
+    if not parts:
+        return None
+    return sum(float(amount) * _DURATION_UNITS[unit] for amount, unit in parts)
+
+
+def _header_int(headers, name: str) -> Optional[int]:
+    value = headers.get(name)
+    if value is None:
+        return None
+    try:
+        return int(float(value))
+    except ValueError:
+        return None
+
+
+class TokenBucket:
+    """Thread-safe token bucket refilled continuously up to `capacity` every `period` seconds"""
+
+    def __init__(self, capacity: int, period: float = 60.0):
+        self.capacity = float(capacity)
+        self.rate = self.capacity / period
+        self.level = self.capacity
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def acquire(self, amount: float) -> float:
+        """
+        Block until `amount` tokens are available and take them
+
+        Returns:
+            Tokens actually taken (capped at capacity), so refunds can match
+        """
+        # A single request larger than the bucket would otherwise wait forever
+        amount = min(float(amount), self.capacity)
+        while True:
+            with self._lock:
+                self._refill()
+                if self.level >= amount:
+                    self.level -= amount
+                    return amount
+                wait = (amount - self.level) / self.rate
+            time.sleep(wait)
+
+    def adjust(self, delta: float):
+        """Give back (positive) or charge (negative) tokens; the level may go into debt"""
+        with self._lock:
+            self._refill()
+            self.level = min(self.capacity, self.level + delta)
+
+    def clamp(self, remaining: float, reset: Optional[float] = None):
+        """
+        Lower the level to what the server says is actually left
+
+        Args:
+            remaining: Server-reported remaining budget
+            reset: Seconds until the server replenishes; when nothing is left
+                the bucket stays empty until then
+        """
+        with self._lock:
+            self._refill()
+            self.level = min(self.level, float(remaining))
+            if remaining <= 0 and reset:
+                self.level = min(self.level, -reset * self.rate)
+
+
+class ConcurrencyLimiter:
+    """
+    Adaptive cap on in-flight requests (additive increase, multiplicative decrease)
+
+    Starts at `initial` slots, grows toward `maximum` as requests succeed and
+    halves when the server answers 429 or 5xx.
+    """
+
+    def __init__(self, maximum: int, initial: int = 1):
+        self.maximum = max(1, maximum)
+        self.limit = float(min(max(1, initial), self.maximum))
+        self.active = 0
+        self._cond = threading.Condition()
+
+    @contextmanager
+    def slot(self):
+        with self._cond:
+            while self.active >= int(self.limit):
+                self._cond.wait()
+            self.active += 1
+        try:
+            yield
+        finally:
+            with self._cond:
+                self.active -= 1
+                self._cond.notify_all()
+
+    def grow(self, headroom: Optional[int] = None):
+        """Open up roughly one extra slot per window, but never past what the server can take"""
+        with self._cond:
+            limit = min(self.maximum, self.limit + 1.0 / self.limit)
+            if headroom is not None:
+                limit = min(limit, max(1, headroom))
+            self.limit = max(1.0, limit)
+            self._cond.notify_all()
+
+    def throttle(self):
+        with self._cond:
+            self.limit = max(1.0, self.limit / 2)
+
+    def snapshot(self) -> Tuple[int, int]:
+        """Return (active, limit) read together under the lock"""
+        with self._cond:
+            return self.active, int(self.limit)
+
+
+class GenerationScheduler:
+    """
+    Answer many (query, context) pairs concurrently without tripping Groq rate limits
+
+    Requests pass through a requests/min and a tokens/min token bucket, then an
+    adaptive concurrency limiter sized from the x-ratelimit-* response headers.
+    429s and transient server errors are retried with jittered exponential
+    backoff. Identical prompts submitted while one is still in flight share a
+    single request.
+    """
+
+    def __init__(
+        self,
+        generator: AnswerGenerator = None,
+        requests_per_minute: int = None,
+        tokens_per_minute: int = None,
+        max_concurrency: int = None,
+        max_retries: int = None,
+        backoff_base: float = 0.5,
+        backoff_max: float = 30.0,
+        timeout: float = 30,
+        period: float = 60.0,
+    ):
+        """
+        Initialize generation scheduler
+
+        Args:
+            generator: AnswerGenerator used to build and send requests
+                (pass one with `api_url` set to target a local stand-in server)
+            requests_per_minute: Request budget (default: from config)
+            tokens_per_minute: Token budget (default: from config)
+            max_concurrency: Upper bound on in-flight requests (default: from config)
+            max_retries: Retries per request after the first attempt (default: from config)
+            backoff_base: Base delay in seconds for exponential backoff
+            backoff_max: Cap on a single backoff delay in seconds
+            timeout: Per-request HTTP timeout in seconds
+            period: Window in seconds the request and token budgets apply to
+        """
+        self.generator = generator or AnswerGenerator()
+        requests_per_minute = Config.GROQ_REQUESTS_PER_MINUTE if requests_per_minute is None else requests_per_minute
+        tokens_per_minute = Config.GROQ_TOKENS_PER_MINUTE if tokens_per_minute is None else tokens_per_minute
+        max_concurrency = Config.GROQ_MAX_CONCURRENCY if max_concurrency is None else max_concurrency
+        self.max_retries = Config.GROQ_MAX_RETRIES if max_retries is None else max_retries
+        if requests_per_minute < 1 or tokens_per_minute < 1:
+            raise ValueError("requests_per_minute and tokens_per_minute must be positive")
+        if max_concurrency < 1:
+            raise ValueError(f"max_concurrency must be at least 1, got {max_concurrency}")
+        if self.max_retries < 0:
+            raise ValueError(f"max_retries must not be negative, got {self.max_retries}")
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.timeout = timeout
+
+        self._request_bucket = TokenBucket(requests_per_minute, period)
+        self._token_bucket = TokenBucket(tokens_per_minute, period)
+        self._limiter = ConcurrencyLimiter(max_concurrency)
+        self._executor = ThreadPoolExecutor(max_workers=max_concurrency, thread_name_prefix="groq")
+
+        self._lock = threading.Lock()
+        self._in_flight: Dict[str, Future] = {}
+        self._started_at: Optional[float] = None
+        self._finished_at: Optional[float] = None
+        self._stats = {
+            "submitted": 0,
+            "deduplicated": 0,
+            "started": 0,
+            "completed": 0,
+            "failed": 0,
+            "retries": 0,
+            "rate_limited": 0,
+            "total_tokens": 0,
+            "queue_wait_total": 0.0,
+            "queue_wait_max": 0.0,
+            "latency_total": 0.0,
+        }
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.shutdown()
+
+    def shutdown(self, wait: bool = True):
+        self._executor.shutdown(wait=wait)
+
+    def submit(self, query: str, context: str, model: str = None) -> Future:
+        """
+        Schedule one generation
+
+        Args:
+            query: User query
+            context: Retrieved context for the query
+            model: Model override (default: the generator's model)
+
+        Returns:
+            Future resolving to the AnswerGenerator.generate() result dict.
+            Duplicate submissions of an in-flight prompt get the same Future.
+        """
+        payload = self.generator.build_payload(query, context)
+        if model:
+            payload["model"] = model
+        key = json.dumps(payload, sort_keys=True)
+
+        with self._lock:
+            future = self._in_flight.get(key)
+            if future is not None:
+                self._stats["deduplicated"] += 1
+                return future
+            if self._started_at is None:
+                self._started_at = time.monotonic()
+            self._stats["submitted"] += 1
+            future = self._executor.submit(self._run, query, payload, time.monotonic())
+            self._in_flight[key] = future
+
+        future.add_done_callback(lambda f: self._forget(key, f))
+        return future
+
+    def generate_many(self, items: Iterable[Tuple[str, str]]) -> List[Dict[str, Any]]:
+        """
+        Answer a batch of (query, context) pairs
+
+        Returns:
+            Results in input order; failed items carry "status": "error"
+        """
+        futures = [(query, self.submit(query, context)) for query, context in items]
+        results = []
+        for query, future in futures:
+            try:
+                result = dict(future.result())
+                result["status"] = "success"
+            except Exception as e:
+                result = {"query": query, "status": "error", "error": str(e)}
+            results.append(result)
+        return results
+
+    def metrics(self) -> Dict[str, Any]:
+        """Snapshot of throughput and queueing metrics"""
+        with self._lock:
+            stats = dict(self._stats)
+            started_at = self._started_at
+            finished_at = self._finished_at
+        active, limit = self._limiter.snapshot()
+        # Measure up to the last finished request so idle time does not dilute throughput
+        elapsed = finished_at - started_at if started_at is not None and finished_at is not None else 0.0
+        finished = stats["completed"] + stats["failed"]
+        return {
+            "submitted": stats["submitted"],
+            "deduplicated": stats["deduplicated"],
+            "completed": stats["completed"],
+            "failed": stats["failed"],
+            "retries": stats["retries"],
+            "rate_limited": stats["rate_limited"],
+            "queued": stats["submitted"] - stats["started"],
+            "in_flight": active,
+            "concurrency_limit": limit,
+            "avg_queue_wait_s": stats["queue_wait_total"] / stats["started"] if stats["started"] else 0.0,
+            "max_queue_wait_s": stats["queue_wait_max"],
+            "avg_latency_s": stats["latency_total"] / finished if finished else 0.0,
+            "total_tokens": stats["total_tokens"],
+            "elapsed_s": elapsed,
+            "requests_per_s": stats["completed"] / elapsed if elapsed else 0.0,
+            "tokens_per_s": stats["total_tokens"] / elapsed if elapsed else 0.0,
+        }
+
+    def _forget(self, key: str, future: Future):
+        with self._lock:
+            if self._in_flight.get(key) is future:
+                del self._in_flight[key]
+
+    def _estimate_tokens(self, payload: Dict[str, Any]) -> int:
+        # ~4 characters per token for English text, plus the completion budget
+        chars = sum(len(m.get("content", "")) for m in payload.get("messages", []))
+        return chars // 4 + int(payload.get("max_tokens", 0))
+
+    def _backoff(self, attempt: int, retry_after: Optional[float]) -> float:
+        delay = random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
+        if retry_after is not None:
+            delay = max(delay, retry_after + random.uniform(0, self.backoff_base))
+        return delay
+
+    def _observe(self, response: requests.Response, cost: int):
+        """Sync local budgets and concurrency with the server's view of the limits"""
+        remaining_requests = _header_int(response.headers, "x-ratelimit-remaining-requests")
+        remaining_tokens = _header_int(response.headers, "x-ratelimit-remaining-tokens")
+        if remaining_requests is not None:
+            reset = parse_duration(response.headers.get("x-ratelimit-reset-requests"))
+            self._request_bucket.clamp(remaining_requests, reset)
+        if remaining_tokens is not None:
+            reset = parse_duration(response.headers.get("x-ratelimit-reset-tokens"))
+            self._token_bucket.clamp(remaining_tokens, reset)
+
+        if response.status_code == 429 or response.status_code >= 500:
+            self._limiter.throttle()
+            return
+        if not response.ok:
+            return
+        headroom = None
+        if remaining_tokens is not None:
+            headroom = remaining_tokens // max(1, cost)
+        if remaining_requests is not None:
+            headroom = remaining_requests if headroom is None else min(headroom, remaining_requests)
+        self._limiter.grow(headroom)
+
+    def _run(self, query: str, payload: Dict[str, Any], submitted_at: float) -> Dict[str, Any]:
+        try:
+            result = self._attempt(query, payload, submitted_at)
+        except Exception:
+            with self._lock:
+                self._finished_at = time.monotonic()
+                self._stats["failed"] += 1
+                self._stats["latency_total"] += self._finished_at - submitted_at
+            raise
+        with self._lock:
+            self._finished_at = time.monotonic()
+            self._stats["completed"] += 1
+            self._stats["total_tokens"] += (result.get("usage") or {}).get("total_tokens") or 0
+            self._stats["latency_total"] += self._finished_at - submitted_at
+        return result
+
+    def _attempt(self, query: str, payload: Dict[str, Any], submitted_at: float) -> Dict[str, Any]:
+        cost = self._estimate_tokens(payload)
+        last_error: Exception = None
+
+        for attempt in range(self.max_retries + 1):
+            response = None
+            retry_after = None
+            with self._limiter.slot():
+                self._request_bucket.acquire(1)
+                taken = self._token_bucket.acquire(cost)
+                if attempt == 0:
+                    wait = time.monotonic() - submitted_at
+                    with self._lock:
+                        self._stats["started"] += 1
+                        self._stats["queue_wait_total"] += wait
+                        self._stats["queue_wait_max"] = max(self._stats["queue_wait_max"], wait)
+                try:
+                    response = self.generator.post(payload, timeout=self.timeout)
+                except requests.exceptions.ConnectionError as e:
+                    # Never reached the server, so neither the request nor its tokens were spent
+                    self._request_bucket.adjust(1)
+                    self._token_bucket.adjust(taken)
+                    last_error = e
+                except requests.exceptions.Timeout as e:
+                    last_error = e
+
+            if response is not None and response.ok:
+                result = self.generator.parse_response(query, response.json())
+                result["model"] = payload["model"]
+                used = (result.get("usage") or {}).get("total_tokens") or 0
+                # Correct the estimate first; _observe then clamps to the server's count
+                if used:
+                    self._token_bucket.adjust(taken - used)
+                self._observe(response, cost)
+                return result
+
+            if response is not None:
+                if response.status_code == 429:
+                    self._token_bucket.adjust(taken)
+                    with self._lock:
+                        self._stats["rate_limited"] += 1
+                self._observe(response, cost)
+                try:
+                    response.raise_for_status()
+                except requests.exceptions.HTTPError as e:
+                    last_error = e
+                if response.status_code not in RETRYABLE_STATUS:
+                    break
+                retry_after = parse_duration(response.headers.get("retry-after"))
+
+            if attempt == self.max_retries:
+                break
+            with self._lock:
+                self._stats["retries"] += 1
+            time.sleep(self._backoff(attempt, retry_after))
+
+        raise last_error
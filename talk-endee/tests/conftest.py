@@ -0,0 +1,23 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from standin_server import StandInGroqServer  # noqa: E402
+
+
+@pytest.fixture
+def make_server():
+    servers = []
+
+    def factory(**kwargs):
+        server = StandInGroqServer(**kwargs).start()
+        servers.append(server)
+        return server
+
+    yield factory
+    for server in servers:
+        server.stop()
@@ -0,0 +1,174 @@
+"""
+Stand-in for the Groq chat completions endpoint that enforces rate limits locally
+"""
+
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import List, Dict, Any, Optional
+import json
+import threading
+import time
+
+
+class StandInGroqServer:
+    """
+    Local OpenAI-compatible /chat/completions server with Groq-style limits
+
+    Requests and tokens are replenished continuously over `period` seconds,
+    like Groq's own limits. Over-limit requests get 429 with retry-after and
+    x-ratelimit-remaining-* headers. Canned responses (5xx, bad bodies) can be
+    queued with respond_next().
+    """
+
+    def __init__(
+        self,
+        requests_per_minute: int = 1000,
+        tokens_per_minute: int = 1000000,
+        period: float = 60.0,
+        latency: float = 0.0,
+        tokens_per_request: int = 15,
+        retry_after: float = 0.05,
+        advertised_remaining_requests: Optional[int] = None,
+    ):
+        self.requests_per_minute = requests_per_minute
+        self.tokens_per_minute = tokens_per_minute
+        self.period = period
+        self.latency = latency
+        self.tokens_per_request = tokens_per_request
+        self.retry_after = retry_after
+        # Report this in x-ratelimit-remaining-requests instead of the real budget,
+        # to simulate a server that is always close to its limit
+        self.advertised_remaining_requests = advertised_remaining_requests
+
+        self.payloads: List[Dict[str, Any]] = []
+        self.accepted = 0
+        self.rejected = 0
+        self.active = 0
+        self.max_active = 0
+
+        self._lock = threading.Lock()
+        self._canned: List[Dict[str, Any]] = []
+        self._requests_left = float(requests_per_minute)
+        self._tokens_left = float(tokens_per_minute)
+        self._updated = time.monotonic()
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), self._handler())
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self._server.server_port}"
+
+    @property
+    def calls(self) -> int:
+        return len(self.payloads)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def respond_next(self, count: int, status: int, body: Optional[str] = None, headers: Dict[str, str] = None):
+        """Answer the next `count` requests with a canned status and body instead of a completion"""
+        with self._lock:
+            for _ in range(count):
+                self._canned.append({"status": status, "body": body, "headers": headers or {}})
+
+    def _refill(self):
+        now = time.monotonic()
+        elapsed = now - self._updated
+        self._updated = now
+        self._requests_left = min(
+            self.requests_per_minute, self._requests_left + elapsed * self.requests_per_minute / self.period
+        )
+        self._tokens_left = min(
+            self.tokens_per_minute, self._tokens_left + elapsed * self.tokens_per_minute / self.period
+        )
+
+    def _limit_headers(self) -> Dict[str, str]:
+        return {
+            "x-ratelimit-limit-requests": str(self.requests_per_minute),
+            "x-ratelimit-limit-tokens": str(self.tokens_per_minute),
+            "x-ratelimit-remaining-requests": str(
+                int(self._requests_left) if self.advertised_remaining_requests is None
+                else self.advertised_remaining_requests
+            ),
+            "x-ratelimit-remaining-tokens": str(int(self._tokens_left)),
+        }
+
+    def _admit(self, payload: Dict[str, Any]):
+        """Return (status, body, headers) for a request, charging the limits if accepted"""
+        with self._lock:
+            self.payloads.append(payload)
+            if self._canned:
+                canned = self._canned.pop(0)
+                headers = dict(canned["headers"])
+                if canned["status"] == 429:
+                    headers.setdefault("retry-after", str(self.retry_after))
+                    self.rejected += 1
+                return canned["status"], canned["body"], headers
+
+            self._refill()
+            if self._requests_left < 1 or self._tokens_left < self.tokens_per_request:
+                self.rejected += 1
+                headers = self._limit_headers()
+                headers["retry-after"] = str(self.retry_after)
+                return 429, json.dumps({"error": {"message": "Rate limit reached"}}), headers
+
+            self._requests_left -= 1
+            self._tokens_left -= self.tokens_per_request
+            self.accepted += 1
+            headers = self._limit_headers()
+
+        content = payload["messages"][-1]["content"]
+        body = json.dumps({
+            "model": payload.get("model"),
+            "choices": [{"message": {"role": "assistant", "content": f"Answer to: {content[-40:]}"}}],
+            "usage": {
+                "prompt_tokens": self.tokens_per_request - 5,
+                "completion_tokens": 5,
+                "total_tokens": self.tokens_per_request,
+            },
+        })
+        return 200, body, headers
+
+    def _handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def do_POST(self):
+                length = int(self.headers.get("Content-Length", 0))
+                payload = json.loads(self.rfile.read(length) or b"{}")
+
+                with server._lock:
+                    server.active += 1
+                    server.max_active = max(server.max_active, server.active)
+                try:
+                    if server.latency:
+                        time.sleep(server.latency)
+                    status, body, headers = server._admit(payload)
+                finally:
+                    with server._lock:
+                        server.active -= 1
+
+                data = (body or "").encode()
+                self.send_response(status)
+                for name, value in headers.items():
+                    self.send_header(name, value)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+        return Handler
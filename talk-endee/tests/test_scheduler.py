@@ -0,0 +1,276 @@
+import json
+import time
+
+import pytest
+import requests
+
+from src.generator import AnswerGenerator
+from src.scheduler import ConcurrencyLimiter, GenerationScheduler, TokenBucket, parse_duration
+
+
+def make_scheduler(server, **kwargs):
+    options = {
+        "requests_per_minute": 1000,
+        "tokens_per_minute": 1000000,
+        "max_concurrency": 4,
+        "max_retries": 3,
+        "backoff_base": 0.01,
+        "timeout": 5,
+    }
+    options.update(kwargs)
+    return GenerationScheduler(AnswerGenerator(model="test-model", api_url=server.url), **options)
+
+
+def assert_metrics_settled(metrics):
+    assert metrics["completed"] + metrics["failed"] == metrics["submitted"]
+    assert metrics["queued"] == 0
+    assert metrics["in_flight"] == 0
+
+
+def test_parse_duration():
+    assert parse_duration("2") == 2.0
+    assert parse_duration("0.5") == 0.5
+    assert parse_duration("7.66s") == pytest.approx(7.66)
+    assert parse_duration("2m59.56s") == pytest.approx(179.56)
+    assert parse_duration("120ms") == pytest.approx(0.12)
+    assert parse_duration("") is None
+    assert parse_duration("soon") is None
+
+
+def test_token_bucket_returns_amount_taken():
+    assert TokenBucket(100).acquire(30) == 30
+    assert TokenBucket(100).acquire(500) == 100
+
+
+def test_token_bucket_stays_empty_until_reset():
+    bucket = TokenBucket(60, period=60.0)
+    bucket.clamp(0, reset=5.0)
+    assert bucket.level <= -5.0
+
+
+def test_limiter_grows_from_initial_and_halves_on_throttle():
+    limiter = ConcurrencyLimiter(8)
+    assert limiter.limit == 1
+    for _ in range(50):
+        limiter.grow()
+    assert limiter.limit == 8
+    limiter.grow(headroom=3)
+    assert limiter.limit == 3
+    limiter.throttle()
+    assert limiter.limit == 1.5
+
+
+def test_rejects_invalid_concurrency():
+    with pytest.raises(ValueError, match="max_concurrency"):
+        GenerationScheduler(AnswerGenerator(api_url="http://127.0.0.1:9"), max_concurrency=0)
+    with pytest.raises(ValueError, match="max_concurrency"):
+        GenerationScheduler(AnswerGenerator(api_url="http://127.0.0.1:9"), max_concurrency=-2)
+
+
+def test_server_never_sees_more_than_its_limit(make_server):
+    server = make_server(requests_per_minute=6, period=1.0)
+    with make_scheduler(server, requests_per_minute=5, period=1.0) as scheduler:
+        results = scheduler.generate_many([(f"question {i}", "context") for i in range(12)])
+        metrics = scheduler.metrics()
+
+    assert all(r["status"] == "success" for r in results)
+    assert server.rejected == 0
+    assert server.accepted == 12
+    assert metrics["rate_limited"] == 0
+    assert_metrics_settled(metrics)
+
+
+def test_over_limit_requests_are_retried_after_429(make_server):
+    server = make_server(requests_per_minute=4, period=1.0)
+    with make_scheduler(server, max_retries=20, backoff_max=0.5) as scheduler:
+        results = scheduler.generate_many([(f"question {i}", "context") for i in range(10)])
+        metrics = scheduler.metrics()
+
+    assert all(r["status"] == "success" for r in results)
+    assert server.rejected > 0
+    assert metrics["rate_limited"] == server.rejected
+    assert_metrics_settled(metrics)
+
+
+def test_429_retried_then_succeeds(make_server):
+    server = make_server()
+    server.respond_next(2, 429)
+    with make_scheduler(server, max_retries=2) as scheduler:
+        result = scheduler.submit("question", "context").result()
+        metrics = scheduler.metrics()
+
+    assert result["answer"].startswith("Answer to:")
+    assert server.calls == 3
+    assert metrics["retries"] == 2
+    assert metrics["rate_limited"] == 2
+
+
+@pytest.mark.parametrize("status", [429, 503])
+def test_retries_exhausted_raise(make_server, status):
+    server = make_server()
+    server.respond_next(3, status)
+    with make_scheduler(server, max_retries=2) as scheduler:
+        with pytest.raises(requests.exceptions.HTTPError):
+            scheduler.submit("question", "context").result()
+        metrics = scheduler.metrics()
+
+    assert server.calls == 3
+    assert metrics["retries"] == 2
+    assert metrics["failed"] == 1
+    assert_metrics_settled(metrics)
+
+
+def test_client_errors_are_not_retried(make_server):
+    server = make_server()
+    server.respond_next(1, 400, json.dumps({"error": {"message": "bad request"}}))
+    with make_scheduler(server) as scheduler:
+        with pytest.raises(requests.exceptions.HTTPError):
+            scheduler.submit("question", "context").result()
+        metrics = scheduler.metrics()
+
+    assert server.calls == 1
+    assert metrics["retries"] == 0
+    assert_metrics_settled(metrics)
+
+
+def test_throttle_halves_concurrency_on_429(make_server):
+    server = make_server()
+    with make_scheduler(server, max_concurrency=4) as scheduler:
+        assert scheduler.metrics()["concurrency_limit"] == 1
+        for i in range(10):
+            scheduler.submit(f"question {i}", "context").result()
+        assert scheduler.metrics()["concurrency_limit"] == 4
+
+        server.respond_next(1, 429)
+        scheduler.submit("one more", "context").result()
+        metrics = scheduler.metrics()
+
+    assert metrics["rate_limited"] == 1
+    # Halved to 2 by the 429, then the retry's success adds half a slot
+    assert 2 <= metrics["concurrency_limit"] < 4
+
+
+def test_identical_in_flight_payloads_are_deduplicated(make_server):
+    server = make_server(latency=0.3)
+    with make_scheduler(server) as scheduler:
+        futures = [scheduler.submit("same question", "same context") for _ in range(5)]
+        results = [f.result() for f in futures]
+        metrics = scheduler.metrics()
+
+    assert server.calls == 1
+    assert all(r is results[0] for r in results)
+    assert metrics["submitted"] == 1
+    assert metrics["deduplicated"] == 4
+    assert_metrics_settled(metrics)
+
+
+def test_different_models_are_not_deduplicated(make_server):
+    server = make_server(latency=0.3)
+    with make_scheduler(server) as scheduler:
+        first = scheduler.submit("same question", "same context", model="model-a")
+        second = scheduler.submit("same question", "same context", model="model-b")
+        results = [first.result(), second.result()]
+        metrics = scheduler.metrics()
+
+    assert server.calls == 2
+    assert sorted(p["model"] for p in server.payloads) == ["model-a", "model-b"]
+    assert [r["model"] for r in results] == ["model-a", "model-b"]
+    assert metrics["deduplicated"] == 0
+
+
+def test_completed_payloads_are_sent_again(make_server):
+    server = make_server()
+    with make_scheduler(server) as scheduler:
+        scheduler.submit("question", "context").result()
+        scheduler.submit("question", "context").result()
+
+    assert server.calls == 2
+
+
+def test_malformed_success_bodies_are_counted(make_server):
+    server = make_server()
+    server.respond_next(1, 200, "not json")
+    server.respond_next(1, 200, json.dumps({"choices": [{"message": {"content": "hi"}}], "usage": None}))
+    with make_scheduler(server, max_concurrency=1) as scheduler:
+        with pytest.raises(ValueError):
+            scheduler.submit("first", "context").result()
+        result = scheduler.submit("second", "context").result()
+        metrics = scheduler.metrics()
+
+    assert result["answer"] == "hi"
+    assert metrics["failed"] == 1
+    assert metrics["completed"] == 1
+    assert metrics["total_tokens"] == 0
+    assert_metrics_settled(metrics)
+
+
+def test_generate_many_reports_errors_in_order(make_server):
+    server = make_server()
+    server.respond_next(1, 400)
+    with make_scheduler(server, max_concurrency=1) as scheduler:
+        results = scheduler.generate_many([("bad", "context"), ("good", "context")])
+        metrics = scheduler.metrics()
+
+    assert [r["status"] for r in results] == ["error", "success"]
+    assert [r["query"] for r in results] == ["bad", "good"]
+    assert metrics["total_tokens"] == server.tokens_per_request
+    assert metrics["requests_per_s"] > 0
+    assert_metrics_settled(metrics)
+
+
+def test_server_errors_do_not_grow_concurrency(make_server):
+    server = make_server()
+    server.respond_next(3, 503)
+    with make_scheduler(server, max_concurrency=8, max_retries=2) as scheduler:
+        with pytest.raises(requests.exceptions.HTTPError):
+            scheduler.submit("failing", "context").result()
+        assert scheduler.metrics()["concurrency_limit"] == 1
+
+        for i in range(10):
+            scheduler.submit(f"question {i}", "context").result()
+        grown = scheduler.metrics()["concurrency_limit"]
+        assert grown > 1
+
+        server.respond_next(3, 503)
+        with pytest.raises(requests.exceptions.HTTPError):
+            scheduler.submit("failing again", "context").result()
+        metrics = scheduler.metrics()
+
+    assert metrics["concurrency_limit"] < grown
+    assert_metrics_settled(metrics)
+
+
+def test_remaining_headers_cap_concurrency(make_server):
+    server = make_server(latency=0.05, advertised_remaining_requests=3)
+    with make_scheduler(server, max_concurrency=8, requests_per_minute=6000) as scheduler:
+        results = scheduler.generate_many([(f"question {i}", "context") for i in range(30)])
+        metrics = scheduler.metrics()
+
+    assert all(r["status"] == "success" for r in results)
+    assert metrics["concurrency_limit"] == 3
+    assert server.max_active == 3
+
+
+def test_backoff_honours_retry_after(make_server):
+    server = make_server()
+    server.respond_next(1, 429, headers={"retry-after": "0.4"})
+    with make_scheduler(server, backoff_base=0.01) as scheduler:
+        start = time.monotonic()
+        scheduler.submit("question", "context").result()
+        elapsed = time.monotonic() - start
+
+    assert server.calls == 2
+    assert elapsed >= 0.4
+
+
+def test_throughput_ignores_idle_time(make_server):
+    server = make_server()
+    with make_scheduler(server) as scheduler:
+        scheduler.generate_many([(f"question {i}", "context") for i in range(5)])
+        before = scheduler.metrics()
+        time.sleep(0.3)
+        after = scheduler.metrics()
+
+    assert before["requests_per_s"] > 0
+    assert after["requests_per_s"] == before["requests_per_s"]
+    assert after["elapsed_s"] == before["elapsed_s"]